@@ -1,8 +1,73 @@
+from datetime import timedelta
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils import timezone
+from django.utils.functional import cached_property
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
 from .models import UserProfile, Product, Order, OrderItem
 
+class CreatedWithinFilter(admin.SimpleListFilter):
+    """
+    Filters by fixed created_at buckets instead of scanning distinct dates.
+    """
+    title = 'created'
+    parameter_name = 'created_within'
+
+    # Number of calendar days covered by each bucket, including today
+    BUCKETS = {
+        'today': 1,
+        '7d': 7,
+        '30d': 30,
+    }
+
+    def lookups(self, request, model_admin):
+        return (
+            ('today', 'Today'),
+            ('7d', 'Past 7 days'),
+            ('30d', 'Past 30 days'),
+        )
+
+    def queryset(self, request, queryset):
+        days = self.BUCKETS.get(self.value())
+        if days is None:
+            return queryset
+        start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        return queryset.filter(created_at__gte=start - timedelta(days=days - 1))
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Uses the planner's row estimate for unfiltered Postgres changelists.
+    Falls back to an exact COUNT(*) for filtered or small tables.
+    """
+    EXACT_COUNT_THRESHOLD = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                # Resolve the table through the search path, as the queryset does
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)",
+                    [connection.ops.quote_name(queryset.model._meta.db_table)]
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= self.EXACT_COUNT_THRESHOLD:
+                return row[0]
+        return super().count
+
+class ModelAdminEstimateCountMixin:
+    """
+    Avoids exact row counts on changelist pages of large tables.
+    """
+    show_full_result_count = False
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        return EstimatedCountPaginator(queryset, per_page, orphans, allow_empty_first_page)
+
 class UserProfileInline(admin.StackedInline):
     model = UserProfile
     can_delete = False
@@ -11,6 +76,10 @@ class UserProfileInline(admin.StackedInline):
 class UserAdmin(BaseUserAdmin):
     inlines = (UserProfileInline,)
     list_display = ('username', 'email', 'first_name', 'last_name', 'get_user_type', 'is_staff')
+    list_select_related = ('profile',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('profile')
     
     def get_user_type(self, obj):
         return obj.profile.user_type
@@ -21,21 +90,25 @@ admin.site.unregister(User)
 admin.site.register(User, UserAdmin)
 
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(ModelAdminEstimateCountMixin, admin.ModelAdmin):
     list_display = ('name', 'price', 'stock', 'created_at', 'updated_at')
-    list_filter = ('created_at', 'updated_at')
+    list_filter = (CreatedWithinFilter,)
     search_fields = ('name', 'description')
     readonly_fields = ('created_at', 'updated_at')
+    # Gives the order item autocomplete a stable page order
+    ordering = ('name',)
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 1
     readonly_fields = ('price',)
+    autocomplete_fields = ('product',)
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(ModelAdminEstimateCountMixin, admin.ModelAdmin):
     list_display = ('id', 'customer', 'total_price', 'status', 'created_at')
-    list_filter = ('status', 'created_at')
+    list_select_related = ('customer',)
+    list_filter = ('status', CreatedWithinFilter)
     search_fields = ('customer__username', 'customer__email')
     readonly_fields = ('total_price', 'created_at', 'updated_at')
     inlines = [OrderItemInline]
\ No newline at end of file
@@ -1,7 +1,9 @@
+from decimal import Decimal
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
-from django.db.models.signals import post_save
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
 class UserProfile(models.Model):
@@ -15,6 +17,11 @@ class UserProfile(models.Model):
     phone = models.CharField(max_length=15, blank=True, null=True)
     address = models.TextField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'user_type'], name='profile_user_type_idx'),
+        ]
+
     def __str__(self):
         return self.user.username
 
@@ -26,7 +33,39 @@ class UserProfile(models.Model):
 def create_or_update_user_profile(sender, instance, created, **kwargs):
     if created:
         UserProfile.objects.create(user=instance)
-    instance.profile.save()
+    else:
+        instance.profile.save()
+
+# Cached user types; other workers may serve a changed type for at
+# most USER_TYPE_CACHE_TIMEOUT seconds
+USER_TYPE_CACHE_TIMEOUT = 60
+
+def _user_type_cache_key(user_id):
+    return f'user_type:{user_id}'
+
+def get_cached_user_type(user_id):
+    """
+    Return a user's type, cached for USER_TYPE_CACHE_TIMEOUT seconds.
+    Returns None when the user has no profile.
+    """
+    key = _user_type_cache_key(user_id)
+    user_type = cache.get(key)
+    if user_type is None:
+        user_type = UserProfile.objects.filter(user_id=user_id).values_list(
+            'user_type', flat=True
+        ).first()
+        if user_type is not None:
+            cache.set(key, user_type, USER_TYPE_CACHE_TIMEOUT)
+    return user_type
+
+def clear_cached_user_type(user_id):
+    cache.delete(_user_type_cache_key(user_id))
+
+# Signal to evict the cached user type when a UserProfile changes
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def clear_cached_user_type_on_change(sender, instance, **kwargs):
+    clear_cached_user_type(instance.user_id)
 
 class Product(models.Model):
     name = models.CharField(max_length=200)
@@ -34,12 +73,18 @@ class Product(models.Model):
     price = models.DecimalField(
         max_digits=10, 
         decimal_places=2,
-        validators=[MinValueValidator(0.01)]
+        validators=[MinValueValidator(Decimal('0.01'))]
     )
     stock = models.IntegerField(validators=[MinValueValidator(0)])
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            models.CheckConstraint(condition=models.Q(price__gt=0), name='price_pos'),
+            models.CheckConstraint(condition=models.Q(stock__gte=0), name='stock_nonneg'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -63,6 +108,12 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['customer', '-created_at'], name='order_customer_created_idx'),
+            models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),
+        ]
+
 class OrderItem(models.Model):
     order = models.ForeignKey(
         Order,
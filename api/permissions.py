@@ -1,20 +1,35 @@
 from rest_framework import permissions
+from rest_framework_simplejwt.tokens import Token
+from .models import get_cached_user_type
+
+
+def get_user_type(request):
+    """
+    Return the requesting user's type, preferring the JWT claim over a query.
+    """
+    if isinstance(request.auth, Token) and 'user_type' in request.auth:
+        return request.auth['user_type']
+    return get_cached_user_type(request.user.pk)
 
 class IsAdminUser(permissions.BasePermission):
     """
     Allows access only to admin users.
     """
     def has_permission(self, request, view):
-        return bool(request.user and request.user.is_authenticated and 
-                   request.user.profile.user_type == 'admin') or request.user.is_superuser
+        user = request.user
+        if not user or not user.is_authenticated:
+            return False
+        return user.is_superuser or get_user_type(request) == 'admin'
 
 class IsCustomer(permissions.BasePermission):
     """
     Allows access only to customer users.
     """
     def has_permission(self, request, view):
-        return bool(request.user and request.user.is_authenticated and 
-                   request.user.profile.user_type == 'customer')
+        user = request.user
+        if not user or not user.is_authenticated:
+            return False
+        return get_user_type(request) == 'customer'
 
 class IsOrderOwner(permissions.BasePermission):
     """
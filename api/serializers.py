@@ -1,6 +1,17 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.models import User
-from .models import UserProfile, Product, Order, OrderItem
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import UserProfile, Product, Order, OrderItem, clear_cached_user_type
+
+
+# Upper bound on the orders a single bulk request can ask for
+MAX_BULK_ORDERS = 50
 
 
 class UserProfileSerializer(serializers.ModelSerializer):
@@ -27,41 +38,187 @@ class UserSerializer(serializers.ModelSerializer):
         user.save()
         
         # Profile is automatically created by signal, just update it
-        for attr, value in profile_data.items():
-            setattr(user.profile, attr, value)
-        user.profile.save()
+        if profile_data:
+            UserProfile.objects.filter(user=user).update(**profile_data)
+            # update() bypasses post_save, so evict the cached user type here
+            clear_cached_user_type(user.pk)
+            for attr, value in profile_data.items():
+                setattr(user.profile, attr, value)
         
         return user
 
 
+class UserRefreshToken(RefreshToken):
+    """
+    Refresh token whose access tokens carry the user's current type.
+    The claim is never stored on the refresh token itself, so a role
+    change takes effect the next time an access token is minted.
+    """
+    no_copy_claims = RefreshToken.no_copy_claims + ('user_type',)
+
+    @property
+    def access_token(self):
+        access = super().access_token
+        access['user_type'] = UserProfile.objects.filter(
+            user_id=self[api_settings.USER_ID_CLAIM]
+        ).values_list('user_type', flat=True).first()
+        return access
+
+
+class UserTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = UserRefreshToken
+
+
+class UserTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = UserRefreshToken
+
+
 class ProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
         fields = ['id', 'name', 'description', 'price', 'stock']
 
-    def validate_price(self, value):
-        """
-        Check that the price is positive
-        """
-        if value <= 0:
-            raise serializers.ValidationError("Price must be greater than zero")
-        return value
 
-    def validate_stock(self, value):
-        """
-        Check that the stock is non-negative
-        """
-        if value < 0:
-            raise serializers.ValidationError("Stock cannot be negative")
-        return value
+class BatchedProductField(serializers.PrimaryKeyRelatedField):
+    """
+    Resolves products from the batch preloaded by OrderSerializer,
+    falling back to a per-item query when no batch is available.
+    """
+    def to_internal_value(self, data):
+        products = self.context.get('products')
+        if products is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = Product._meta.pk.to_python(data)
+        except DjangoValidationError:
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in products:
+            self.fail('does_not_exist', pk_value=data)
+        return products[pk]
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
+    product = BatchedProductField(queryset=Product.objects.all())
+
     class Meta:
         model = OrderItem
         fields = ['product', 'quantity']
 
 
+def prefetch_ordered_products(orders_data, context, max_items=None):
+    """
+    Fetch every product referenced by the given order payloads in a
+    single query, sharing the result through the serializer context.
+    Orders over max_items are skipped; their items are rejected
+    before any product is looked up. Ids the backend cannot store are
+    left out, so they are reported as missing rather than overflowing.
+    """
+    pk_field = Product._meta.pk
+    min_id, max_id = connection.ops.integer_field_range(pk_field.get_internal_type())
+    product_ids = set()
+    for order_data in orders_data:
+        items = order_data.get('items') if isinstance(order_data, dict) else None
+        if not isinstance(items, list):
+            continue
+        if max_items is not None and len(items) > max_items:
+            continue
+        for item in items:
+            try:
+                pk = pk_field.to_python(item['product'])
+            except (TypeError, KeyError, DjangoValidationError):
+                continue
+            if pk is not None and min_id <= pk <= max_id:
+                product_ids.add(pk)
+    context['products'] = Product.objects.in_bulk(product_ids)
+
+
+def build_order_items(items_data, quantities):
+    """
+    Build one order's unsaved items and return them with the total price.
+    Ordered quantities are accumulated per product into `quantities`.
+    """
+    total_price = 0
+    order_items = []
+    for item_data in items_data:
+        product = item_data['product']
+        quantity = item_data['quantity']
+
+        total_price += product.price * quantity
+        quantities[product] = quantities.get(product, 0) + quantity
+        order_items.append(
+            OrderItem(product=product, quantity=quantity, price=product.price)
+        )
+    return total_price, order_items
+
+
+def decrement_stock(quantities):
+    """
+    Take the ordered quantities out of stock with one conditional UPDATE
+    per product, so concurrent orders cannot oversell without row locks.
+    Products are updated in primary key order so concurrent orders take
+    row locks in the same order and cannot deadlock.
+    update() skips auto_now, so updated_at is set explicitly.
+    """
+    now = timezone.now()
+    for product, quantity in sorted(quantities.items(), key=lambda kv: kv[0].pk):
+        updated = Product.objects.filter(pk=product.pk, stock__gte=quantity).update(
+            stock=F('stock') - quantity,
+            updated_at=now
+        )
+        if not updated:
+            raise serializers.ValidationError(
+                f"Insufficient stock for product: {product.name}"
+            )
+
+
+def create_orders(customer, orders_data):
+    """
+    Create the given orders and their items for one customer.
+    Nothing is written unless every product has enough stock.
+    """
+    quantities = {}
+    orders = []
+    items_per_order = []
+    for order_data in orders_data:
+        total_price, order_items = build_order_items(
+            order_data.pop('items'), quantities
+        )
+        orders.append(Order(customer=customer, total_price=total_price, **order_data))
+        items_per_order.append(order_items)
+
+    with transaction.atomic():
+        decrement_stock(quantities)
+        Order.objects.bulk_create(orders)
+        all_items = []
+        for order, order_items in zip(orders, items_per_order):
+            for order_item in order_items:
+                order_item.order = order
+            all_items.extend(order_items)
+        OrderItem.objects.bulk_create(all_items)
+
+    return orders
+
+
+class OrderListSerializer(serializers.ListSerializer):
+    def to_internal_value(self, data):
+        """
+        Fetch the products of every order in a single query
+        """
+        # Too many orders are rejected below without touching products
+        if isinstance(data, list) and (
+            self.max_length is None or len(data) <= self.max_length
+        ):
+            prefetch_ordered_products(
+                data, self.context, self.child.fields['items'].max_length
+            )
+        return super().to_internal_value(data)
+
+    def create(self, validated_data):
+        return create_orders(self.context['request'].user, validated_data)
+
+
 class OrderSerializer(serializers.ModelSerializer):
     items = OrderItemSerializer(many=True)
     customer = serializers.PrimaryKeyRelatedField(read_only=True)
@@ -70,46 +227,20 @@ class OrderSerializer(serializers.ModelSerializer):
         model = Order
         fields = ['id', 'customer', 'items', 'total_price', 'status']
         read_only_fields = ['total_price', 'status', 'customer']
+        list_serializer_class = OrderListSerializer
 
-    def create(self, validated_data):
-        items_data = validated_data.pop('items')
-        total_price = 0
+    def to_internal_value(self, data):
+        """
+        Fetch every ordered product in a single query
+        """
+        # OrderListSerializer has already loaded products for all orders
+        if self.parent is None:
+            prefetch_ordered_products(
+                [data], self.context, self.fields['items'].max_length
+            )
+        return super().to_internal_value(data)
 
+    def create(self, validated_data):
         # Get customer from context
         customer = self.context['request'].user
-
-        # Validate stock and calculate total price
-        for item_data in items_data:
-            product = item_data['product']
-            quantity = item_data['quantity']
-
-            if product.stock < quantity:
-                raise serializers.ValidationError(
-                    f"Insufficient stock for product: {product.name}"
-                )
-
-            total_price += product.price * quantity
-
-        # Create order with customer
-        order = Order.objects.create(
-            customer=customer,
-            total_price=total_price,
-            **validated_data
-        )
-
-        # Create order items and update stock
-        for item_data in items_data:
-            product = item_data['product']
-            quantity = item_data['quantity']
-
-            OrderItem.objects.create(
-                order=order,
-                product=product,
-                quantity=quantity,
-                price=product.price
-            )
-
-            product.stock -= quantity
-            product.save()
-
-        return order
\ No newline at end of file
+        return create_orders(customer, [validated_data])[0]
\ No newline at end of file
@@ -1,10 +1,19 @@
+from django.contrib import admin as django_admin
+from django.core.cache import cache
+from django.db import IntegrityError
 from django.test import TestCase
 from django.urls import reverse
+from django.utils import timezone
 from django.contrib.auth.models import User
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from datetime import timedelta
+from unittest import mock
 from decimal import Decimal
-from .models import UserProfile, Product, Order, OrderItem
+from .admin import EstimatedCountPaginator
+from .models import UserProfile, Product, Order, OrderItem, get_cached_user_type
+from .serializers import MAX_BULK_ORDERS
 
 class AuthenticationTests(APITestCase):
     def setUp(self):
@@ -30,6 +39,9 @@ class AuthenticationTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertTrue(User.objects.filter(username='testuser').exists())
         self.assertTrue(UserProfile.objects.filter(user__username='testuser').exists())
+        profile = UserProfile.objects.get(user__username='testuser')
+        self.assertEqual(profile.phone, '1234567890')
+        self.assertEqual(response.data['profile']['address'], 'Test Address')
 
     def test_user_registration_duplicate_username(self):
         # Create first user
@@ -52,6 +64,44 @@ class AuthenticationTests(APITestCase):
         self.assertIn('access', response.data)
         self.assertIn('refresh', response.data)
 
+    def test_user_login_token_includes_user_type(self):
+        self.client.post(self.register_url, self.user_data, format='json')
+        response = self.client.post(self.token_url, {
+            'username': 'testuser',
+            'password': 'testpass123'
+        }, format='json')
+        token = AccessToken(response.data['access'])
+        self.assertEqual(token['user_type'], 'customer')
+
+    def test_token_refresh_reflects_user_type_change(self):
+        self.client.post(self.register_url, self.user_data, format='json')
+        profile = UserProfile.objects.get(user__username='testuser')
+        profile.user_type = 'admin'
+        profile.save()
+        response = self.client.post(self.token_url, {
+            'username': 'testuser',
+            'password': 'testpass123'
+        }, format='json')
+        refresh = response.data['refresh']
+        self.assertNotIn('user_type', RefreshToken(refresh))
+
+        # Demote the user; the next refreshed access token must see it
+        profile.user_type = 'customer'
+        profile.save()
+        response = self.client.post(reverse('token_refresh'), {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        access = response.data['access']
+        self.assertEqual(AccessToken(access)['user_type'], 'customer')
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        response = self.client.post(reverse('product-list'), {
+            'name': 'Test Product',
+            'description': 'Test Description',
+            'price': '9.99',
+            'stock': 1
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
     def test_user_login_wrong_credentials(self):
         response = self.client.post(self.token_url, {
             'username': 'wronguser',
@@ -109,6 +159,11 @@ class ProductTests(APITestCase):
         response = self.client.post(self.products_url, self.product_data, format='json')
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
+    def test_create_product_anonymous_unauthorized(self):
+        response = self.client.post(self.products_url, self.product_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(Product.objects.count(), 0)
+
     def test_create_product_invalid_data(self):
         self.client.force_authenticate(user=self.admin_user)
         invalid_product_data = {
@@ -174,9 +229,31 @@ class OrderTests(APITestCase):
         self.assertEqual(Order.objects.count(), 1)
         self.assertEqual(OrderItem.objects.count(), 1)
         
-        # Check if stock was updated
+        # Check if stock and the modification time were updated
         updated_product = Product.objects.get(id=self.product.id)
         self.assertEqual(updated_product.stock, 98)
+        self.assertGreater(updated_product.updated_at, self.product.updated_at)
+
+    def test_create_order_multiple_items(self):
+        self.client.force_authenticate(user=self.customer_user)
+        other_product = Product.objects.create(
+            name='Other Product',
+            description='Other Description',
+            price=Decimal('10.00'),
+            stock=5
+        )
+        order_data = {
+            'items': [
+                {'product': self.product.id, 'quantity': 2},
+                {'product': other_product.id, 'quantity': 3}
+            ]
+        }
+        response = self.client.post(self.orders_url, order_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(OrderItem.objects.count(), 2)
+        self.assertEqual(Decimal(response.data['total_price']), Decimal('229.98'))
+        self.assertEqual(Product.objects.get(id=self.product.id).stock, 98)
+        self.assertEqual(Product.objects.get(id=other_product.id).stock, 2)
 
     def test_create_order_insufficient_stock(self):
         self.client.force_authenticate(user=self.customer_user)
@@ -191,6 +268,128 @@ class OrderTests(APITestCase):
         response = self.client.post(self.orders_url, order_data, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_create_order_repeated_product_insufficient_stock(self):
+        self.client.force_authenticate(user=self.customer_user)
+        order_data = {
+            'items': [
+                {'product': self.product.id, 'quantity': 60},
+                {'product': self.product.id, 'quantity': 60}
+            ]
+        }
+        response = self.client.post(self.orders_url, order_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Order.objects.count(), 0)
+        self.assertEqual(Product.objects.get(id=self.product.id).stock, 100)
+
+    def test_create_order_unknown_product(self):
+        self.client.force_authenticate(user=self.customer_user)
+        order_data = {
+            'items': [
+                {
+                    'product': self.product.id + 1000,
+                    'quantity': 1
+                }
+            ]
+        }
+        response = self.client.post(self.orders_url, order_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('items', response.data)
+
+    def test_create_order_out_of_range_product(self):
+        self.client.force_authenticate(user=self.customer_user)
+        order_data = {
+            'items': [{'product': 10 ** 31, 'quantity': 1}]
+        }
+        response = self.client.post(self.orders_url, order_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['items'][0]['product'][0].code, 'does_not_exist')
+        self.assertEqual(Order.objects.count(), 0)
+
+    def test_bulk_create_orders(self):
+        self.client.force_authenticate(user=self.customer_user)
+        bulk_url = reverse('order-bulk')
+        response = self.client.post(bulk_url, [self.order_data, self.order_data], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 2)
+        self.assertEqual(Order.objects.filter(customer=self.customer_user).count(), 2)
+        self.assertEqual(OrderItem.objects.count(), 2)
+        updated_product = Product.objects.get(id=self.product.id)
+        self.assertEqual(updated_product.stock, 96)
+        self.assertGreater(updated_product.updated_at, self.product.updated_at)
+
+    def test_bulk_create_orders_insufficient_stock(self):
+        self.client.force_authenticate(user=self.customer_user)
+        bulk_url = reverse('order-bulk')
+        order_data = {
+            'items': [
+                {
+                    'product': self.product.id,
+                    'quantity': 60
+                }
+            ]
+        }
+        response = self.client.post(bulk_url, [order_data, order_data], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, ['Insufficient stock for product: Test Product'])
+        self.assertEqual(Order.objects.count(), 0)
+        self.assertEqual(Product.objects.get(id=self.product.id).stock, 100)
+
+    def test_bulk_create_orders_too_many(self):
+        self.client.force_authenticate(user=self.customer_user)
+        get_cached_user_type(self.customer_user.pk)
+        bulk_url = reverse('order-bulk')
+        # Only the savepoint and its rollback; no products are fetched
+        with self.assertNumQueries(3):
+            response = self.client.post(
+                bulk_url, [self.order_data] * (MAX_BULK_ORDERS + 1), format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('non_field_errors', response.data)
+        self.assertEqual(Order.objects.count(), 0)
+
+    def _create_products(self, count):
+        return [
+            Product.objects.create(
+                name=f'Product {i}',
+                description='Test Description',
+                price=Decimal('10.00'),
+                stock=100
+            )
+            for i in range(count)
+        ]
+
+    def test_list_orders_query_count(self):
+        products = self._create_products(2)
+        for _ in range(3):
+            order = Order.objects.create(customer=self.customer_user, total_price=Decimal('20.00'))
+            for product in products:
+                OrderItem.objects.create(
+                    order=order, product=product, quantity=1, price=product.price
+                )
+        self.client.force_authenticate(user=self.customer_user)
+        get_cached_user_type(self.customer_user.pk)
+
+        # One query for orders with customers, one for items with products
+        with self.assertNumQueries(2):
+            response = self.client.get(self.orders_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 3)
+
+    def test_create_order_query_count(self):
+        products = self._create_products(3)
+        order_data = {
+            'items': [{'product': product.id, 'quantity': 1} for product in products]
+        }
+        self.client.force_authenticate(user=self.customer_user)
+        get_cached_user_type(self.customer_user.pk)
+
+        # Two savepoint pairs, one product fetch, one stock UPDATE per
+        # product, the order INSERT, one bulk item INSERT and one query
+        # for the items in the response
+        with self.assertNumQueries(4 + 1 + len(products) + 1 + 1 + 1):
+            response = self.client.post(self.orders_url, order_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
     def test_list_orders_as_customer(self):
         self.client.force_authenticate(user=self.customer_user)
         # Create an order first
@@ -227,6 +426,26 @@ class UserProfileTests(TestCase):
         profile.save()
         self.assertFalse(profile.is_admin())
 
+    def test_cached_user_type_cleared_on_profile_save(self):
+        """Test that the cached user type follows profile changes"""
+        self.assertEqual(get_cached_user_type(self.user.pk), 'customer')
+        profile = self.user.profile
+        profile.user_type = 'admin'
+        profile.save()
+        self.assertEqual(get_cached_user_type(self.user.pk), 'admin')
+
+    def test_cached_user_type_cleared_only_for_saved_profile(self):
+        """Test that saving one profile keeps other users' cached types"""
+        other_user = User.objects.create_user(
+            username='otheruser',
+            password='testpass123'
+        )
+        get_cached_user_type(self.user.pk)
+        get_cached_user_type(other_user.pk)
+        self.user.profile.save()
+        self.assertIsNone(cache.get(f'user_type:{self.user.pk}'))
+        self.assertEqual(cache.get(f'user_type:{other_user.pk}'), 'customer')
+
 class ModelTests(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(
@@ -244,6 +463,26 @@ class ModelTests(TestCase):
         """Test the string representation of Product"""
         self.assertEqual(str(self.product), 'Test Product')
 
+    def test_product_negative_stock_rejected_by_database(self):
+        """Test that the stock check constraint is enforced"""
+        with self.assertRaises(IntegrityError):
+            Product.objects.create(
+                name='Broken Product',
+                description='Test Description',
+                price=Decimal('1.00'),
+                stock=-1
+            )
+
+    def test_product_zero_price_rejected_by_database(self):
+        """Test that the price check constraint is enforced"""
+        with self.assertRaises(IntegrityError):
+            Product.objects.create(
+                name='Free Product',
+                description='Test Description',
+                price=Decimal('0.00'),
+                stock=1
+            )
+
     def test_order_creation(self):
         """Test Order creation and related OrderItem"""
         order = Order.objects.create(
@@ -258,4 +497,102 @@ class ModelTests(TestCase):
         )
         
         self.assertEqual(order.items.count(), 1)
-        self.assertEqual(order_item.price, Decimal('99.99'))
\ No newline at end of file
+        self.assertEqual(order_item.price, Decimal('99.99'))
+
+class AdminTests(TestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(
+            username='admin',
+            password='admin123',
+            email='admin@example.com'
+        )
+        self.client.force_login(self.admin_user)
+
+    def test_created_within_filter_covers_past_seven_calendar_days(self):
+        """Test that the 7 day bucket starts at midnight six days ago"""
+        start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        cutoff = start - timedelta(days=6)
+        for name, created_at in [
+            ('Inside', cutoff),
+            ('Outside', cutoff - timedelta(seconds=1)),
+        ]:
+            product = Product.objects.create(
+                name=name,
+                description='Test Description',
+                price=Decimal('1.00'),
+                stock=1
+            )
+            Product.objects.filter(pk=product.pk).update(created_at=created_at)
+
+        response = self.client.get(
+            reverse('admin:api_product_changelist'), {'created_within': '7d'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        names = [product.name for product in response.context['cl'].result_list]
+        self.assertEqual(names, ['Inside'])
+
+    def test_product_autocomplete_is_ordered_by_name(self):
+        for name in ('Banana', 'Apple'):
+            Product.objects.create(
+                name=name,
+                description='Test Description',
+                price=Decimal('1.00'),
+                stock=1
+            )
+
+        response = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'api',
+            'model_name': 'orderitem',
+            'field_name': 'product',
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        names = [result['text'] for result in response.json()['results']]
+        self.assertEqual(names, ['Apple', 'Banana'])
+
+    def _mock_postgres(self, estimate):
+        connection = mock.MagicMock(vendor='postgresql')
+        connection.ops.quote_name.side_effect = lambda name: f'"{name}"'
+        cursor = connection.cursor.return_value.__enter__.return_value
+        cursor.fetchone.return_value = (estimate,)
+        return connection, cursor
+
+    def test_estimated_count_uses_planner_estimate_when_unfiltered(self):
+        """Test that unfiltered Postgres changelists read pg_class"""
+        connection, cursor = self._mock_postgres(50000)
+        with mock.patch('api.admin.connections', {'default': connection}):
+            paginator = EstimatedCountPaginator(Product.objects.all(), 100)
+            self.assertEqual(paginator.count, 50000)
+        cursor.execute.assert_called_once_with(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)",
+            [f'"{Product._meta.db_table}"']
+        )
+
+    def test_estimated_count_falls_back_for_filtered_queryset(self):
+        """Test that filtered changelists keep an exact count"""
+        Product.objects.create(
+            name='Test Product',
+            description='Test Description',
+            price=Decimal('1.00'),
+            stock=1
+        )
+        connection, cursor = self._mock_postgres(50000)
+        with mock.patch('api.admin.connections', {'default': connection}):
+            paginator = EstimatedCountPaginator(Product.objects.filter(stock=1), 100)
+            self.assertEqual(paginator.count, 1)
+        cursor.execute.assert_not_called()
+
+    def test_estimated_count_falls_back_for_small_tables(self):
+        """Test that estimates below the threshold use an exact count"""
+        connection, cursor = self._mock_postgres(5)
+        with mock.patch('api.admin.connections', {'default': connection}):
+            paginator = EstimatedCountPaginator(Product.objects.all(), 100)
+            self.assertEqual(paginator.count, 0)
+        cursor.execute.assert_called_once()
+
+    def test_order_and_product_admins_use_estimated_count(self):
+        """Test that the changelists are wired to the estimating paginator"""
+        for model in (Order, Product):
+            model_admin = django_admin.site._registry[model]
+            paginator = model_admin.get_paginator(None, model.objects.all(), 100)
+            self.assertIsInstance(paginator, EstimatedCountPaginator)
+            self.assertFalse(model_admin.show_full_result_count)
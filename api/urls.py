@@ -1,7 +1,9 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from .views import ProductViewSet, OrderViewSet, UserRegistrationView
+from .views import (
+    ProductViewSet, OrderViewSet, UserRegistrationView,
+    UserTokenObtainPairView, UserTokenRefreshView
+)
 
 router = DefaultRouter()
 router.register(r'products', ProductViewSet, basename='product')
@@ -10,6 +12,6 @@ router.register(r'orders', OrderViewSet, basename='order')
 urlpatterns = [
     path('', include(router.urls)),
     path('register/', UserRegistrationView.as_view(), name='register'),
-    path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('token/', UserTokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('token/refresh/', UserTokenRefreshView.as_view(), name='token_refresh'),
 ]
\ No newline at end of file
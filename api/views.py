@@ -1,10 +1,31 @@
 from rest_framework import viewsets, status, generics
+from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from django.db import transaction
-from .models import Product, Order, User
-from .serializers import ProductSerializer, OrderSerializer, UserSerializer
-from .permissions import IsAdminUser, IsCustomer, IsOrderOwner, ReadOnly
+from django.db.models import Prefetch, prefetch_related_objects
+from .models import Product, Order, OrderItem, User
+from .serializers import (
+    ProductSerializer, OrderSerializer, UserSerializer,
+    UserTokenObtainPairSerializer, UserTokenRefreshSerializer, MAX_BULK_ORDERS
+)
+from .permissions import IsAdminUser, IsCustomer, IsOrderOwner, ReadOnly, get_user_type
+
+# Composed permission classes and their instances are stateless,
+# so they are built once at import and shared across requests
+_READ_OR_AUTH_CLS = ReadOnly|IsAuthenticated
+_OWNER_OR_ADMIN_CLS = IsAuthenticated & (IsOrderOwner|IsAdminUser)
+
+_ADMIN_PERMS = (IsAdminUser(),)
+_READ_OR_AUTH_PERMS = (_READ_OR_AUTH_CLS(),)
+_CUSTOMER_PERMS = (IsCustomer(),)
+_AUTH_PERMS = (IsAuthenticated(),)
+_OWNER_OR_ADMIN_PERMS = (_OWNER_OR_ADMIN_CLS(),)
+
+_PRODUCT_READ_ACTIONS = frozenset({'list', 'retrieve'})
+_PRODUCT_WRITE_ACTIONS = frozenset({'create', 'update', 'partial_update', 'destroy'})
+_ORDER_CREATE_ACTIONS = frozenset({'create', 'bulk'})
 
 class UserRegistrationView(generics.CreateAPIView):
     """
@@ -15,6 +36,20 @@ class UserRegistrationView(generics.CreateAPIView):
     serializer_class = UserSerializer
     permission_classes = [AllowAny]
 
+class UserTokenObtainPairView(TokenObtainPairView):
+    """
+    API endpoint for obtaining a JWT pair.
+    The access token carries the user type as a claim.
+    """
+    serializer_class = UserTokenObtainPairSerializer
+
+class UserTokenRefreshView(TokenRefreshView):
+    """
+    API endpoint for refreshing an access token.
+    The user type claim is re-read from the profile on every refresh.
+    """
+    serializer_class = UserTokenRefreshSerializer
+
 class ProductViewSet(viewsets.ModelViewSet):
     """
     API endpoint for products.
@@ -24,28 +59,17 @@ class ProductViewSet(viewsets.ModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
 
-    def get_permissions(self):
-        if self.action in ['create', 'update', 'partial_update', 'destroy']:
-            permission_classes = [IsAdminUser]
-        else:
-            permission_classes = [ReadOnly|IsAuthenticated]
-        return [permission() for permission in permission_classes]
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in _PRODUCT_READ_ACTIONS:
+            # Writes keep full rows so auto_now fields are still saved
+            return queryset.only('id', 'name', 'description', 'price', 'stock')
+        return queryset
 
-    def create(self, request, *args, **kwargs):
-        """
-        Create a new product with validation
-        """
-        if not request.user.profile.is_admin():
-            return Response(
-                {'error': 'Only admin users can create products'},
-                status=status.HTTP_403_FORBIDDEN
-            )
-            
-        serializer = self.get_serializer(data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    def get_permissions(self):
+        if self.action in _PRODUCT_WRITE_ACTIONS:
+            return _ADMIN_PERMS
+        return _READ_OR_AUTH_PERMS
 
 class OrderViewSet(viewsets.ModelViewSet):
     """
@@ -58,31 +82,26 @@ class OrderViewSet(viewsets.ModelViewSet):
     http_method_names = ['get', 'post', 'head', 'options']  # Limit available methods
 
     def get_permissions(self):
-        if self.action == 'create':
-            permission_classes = [IsCustomer]
+        if self.action in _ORDER_CREATE_ACTIONS:
+            return _CUSTOMER_PERMS
         elif self.action == 'list':
-            permission_classes = [IsAuthenticated]
-        else:
-            permission_classes = [IsAuthenticated & (IsOrderOwner|IsAdminUser)]
-        return [permission() for permission in permission_classes]
+            return _AUTH_PERMS
+        return _OWNER_OR_ADMIN_PERMS
 
     def get_queryset(self):
         user = self.request.user
-        if user.profile.is_admin():
-            return Order.objects.all()
-        return Order.objects.filter(customer=user)
+        queryset = Order.objects.select_related('customer').prefetch_related(
+            Prefetch('items', queryset=OrderItem.objects.select_related('product'))
+        )
+        if get_user_type(self.request) == 'admin':
+            return queryset
+        return queryset.filter(customer=user)
 
     @transaction.atomic
     def create(self, request, *args, **kwargs):
         """
         Create a new order with stock validation
         """
-        if not request.user.is_authenticated:
-            return Response(
-                {'error': 'Authentication required'},
-                status=status.HTTP_401_UNAUTHORIZED
-            )
-            
         serializer = self.get_serializer(
             data=request.data,
             context={'request': request}
@@ -101,30 +120,20 @@ class OrderViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-    def list(self, request, *args, **kwargs):
+    @action(detail=False, methods=['post'])
+    @transaction.atomic
+    def bulk(self, request, *args, **kwargs):
         """
-        List orders with proper error handling for anonymous users
+        Create several orders at once with stock validation
         """
-        if not request.user.is_authenticated:
-            return Response(
-                {'error': 'Authentication required to view orders'},
-                status=status.HTTP_401_UNAUTHORIZED
-            )
-        return super().list(request, *args, **kwargs)
+        serializer = self.get_serializer(
+            data=request.data, many=True, allow_empty=False, max_length=MAX_BULK_ORDERS
+        )
+        serializer.is_valid(raise_exception=True)
 
-    def retrieve(self, request, *args, **kwargs):
-        """
-        Retrieve single order with proper error handling
-        """
-        if not request.user.is_authenticated:
-            return Response(
-                {'error': 'Authentication required to view order'},
-                status=status.HTTP_401_UNAUTHORIZED
-            )
-        try:
-            return super().retrieve(request, *args, **kwargs)
-        except Order.DoesNotExist:
-            return Response(
-                {'error': 'Order not found'},
-                status=status.HTTP_404_NOT_FOUND
-            )
\ No newline at end of file
+        orders = serializer.save()
+        prefetch_related_objects(orders, 'items')
+        return Response(
+            OrderSerializer(orders, many=True).data,
+            status=status.HTTP_201_CREATED
+        )
\ No newline at end of file